@@ -1,20 +1,24 @@
 # solution/main.py
 # Main orchestration script for Adobe Hackathon Solution - Round 1A Only
 
+import logging
 import os
-import json
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Any
 
 # Add the solution directory to the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from round_1a import extract_outline
+from utils import save_json_output
 
 # Constants
 INPUT_DIR = "/app/input"
 OUTPUT_DIR = "/app/output"
 
+logger = logging.getLogger(__name__)
+
 def run_round_1a(pdf_path: str, output_path: str) -> bool:
     """
     Run Round 1A: Document Outline Extraction
@@ -26,8 +30,6 @@ def run_round_1a(pdf_path: str, output_path: str) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    print(f"Processing Round 1A: {os.path.basename(pdf_path)}")
-    
     try:
         result = extract_outline(pdf_path)
         
@@ -41,67 +43,76 @@ def run_round_1a(pdf_path: str, output_path: str) -> bool:
             # Validate outline format
             for item in output["outline"]:
                 if not all(key in item for key in ["level", "text", "page"]):
-                    print(f"Warning: Invalid outline item format in {pdf_path}")
+                    logger.error(f"Warning: Invalid outline item format in {pdf_path}")
                     return False
             
-            # Write output
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(output, f, indent=2, ensure_ascii=False)
-            
-            print(f"✅ Successfully generated outline: {os.path.basename(output_path)}")
+            # Write output (orjson-backed when available)
+            save_json_output(output, output_path)
             return True
         else:
-            print(f"❌ Failed to extract outline from {pdf_path}")
+            logger.error(f"❌ Failed to extract outline from {pdf_path}")
             return False
-            
+
     except Exception as e:
-        print(f"❌ Error processing {pdf_path}: {e}")
+        logger.error(f"❌ Error processing {pdf_path}: {e}")
         return False
 
 def main():
     """Main execution function for Round 1A only."""
-    print("🚀 Adobe Hackathon Solution - Round 1A")
-    print("=" * 40)
+    # Buffered stderr logging; per-file chatter is gone, workers just
+    # return a status and the parent logs the summary
+    logging.basicConfig(stream=sys.stderr, level=logging.INFO, format='%(message)s')
+    logger.info("🚀 Adobe Hackathon Solution - Round 1A")
+    logger.info("=" * 40)
     
     # Ensure output directory exists
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     
     # Get all PDF files from input directory
     try:
-        files = os.listdir(INPUT_DIR)
-        pdf_files = [f for f in files if f.lower().endswith(".pdf")]
-        
-        if not pdf_files:
-            print("❌ No PDF files found in input directory")
-            print("Please add PDF files to the input directory and try again.")
+        with os.scandir(INPUT_DIR) as entries:
+            pdf_entries = [e for e in entries if e.is_file() and e.name.lower().endswith(".pdf")]
+
+        if not pdf_entries:
+            logger.error("❌ No PDF files found in input directory")
+            logger.error("Please add PDF files to the input directory and try again.")
             sys.exit(1)
+
+        logger.info(f"📋 Found {len(pdf_entries)} PDF file(s) to process")
+
+        # Build the (input, output) path pairs up front
+        pdf_paths = []
+        output_paths = []
+        for entry in pdf_entries:
+            pdf_paths.append(entry.path)
+            output_filename = os.path.splitext(entry.name)[0] + ".json"
+            output_paths.append(os.path.join(OUTPUT_DIR, output_filename))
+
+        total_count = len(pdf_entries)
+
+        # Each PDF is independent and CPU-bound, so fan out across cores.
+        # A single PDF isn't worth the process startup cost - run it inline.
+        if total_count == 1:
+            results = [run_round_1a(pdf_paths[0], output_paths[0])]
+        else:
+            max_workers = min(total_count, os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(run_round_1a, pdf_paths, output_paths, chunksize=1))
+
+        success_count = sum(1 for ok in results if ok)
         
-        print(f"📋 Found {len(pdf_files)} PDF file(s) to process")
-        
-        # Process each PDF individually
-        success_count = 0
-        total_count = len(pdf_files)
-        
-        for pdf_file in pdf_files:
-            pdf_path = os.path.join(INPUT_DIR, pdf_file)
-            output_filename = os.path.splitext(pdf_file)[0] + ".json"
-            output_path = os.path.join(OUTPUT_DIR, output_filename)
-            
-            if run_round_1a(pdf_path, output_path):
-                success_count += 1
-        
-        print(f"\n📊 Round 1A Results: {success_count}/{total_count} files processed successfully")
+        logger.info(f"\n📊 Round 1A Results: {success_count}/{total_count} files processed successfully")
         
         if success_count == total_count:
-            print("🎉 All PDFs processed successfully!")
+            logger.info("🎉 All PDFs processed successfully!")
         else:
-            print("⚠️  Some files failed to process. Check the output above for details.")
+            logger.info("⚠️  Some files failed to process. Check the output above for details.")
         
     except Exception as e:
-        print(f"❌ Error accessing input directory: {e}")
+        logger.error(f"❌ Error accessing input directory: {e}")
         sys.exit(1)
     
-    print("\n🎉 Processing complete!")
+    logger.info("\n🎉 Processing complete!")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file